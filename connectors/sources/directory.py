@@ -6,16 +6,71 @@
 """
 Demo of a standalone source
 """
+import asyncio
+import fnmatch
 import functools
 import hashlib
+import itertools
 import os
+import re
+import stat as stat_module
 from datetime import datetime, timezone
-from pathlib import Path
 
 from connectors.source import BaseDataSource
 from connectors.utils import TIKA_SUPPORTED_FILETYPES, get_base64_value
 
 DEFAULT_DIR = os.environ.get("SYSTEM_DIR", os.path.dirname(__file__))
+# `**` pattern component, matching a directory and all of its subdirectories
+RECURSIVE = object()
+# number of files listed, stat-ed and hashed per worker thread round-trip
+SCAN_BATCH_SIZE = 64
+SUPPORTED_EXTENSIONS = frozenset(ext.lower() for ext in TIKA_SUPPORTED_FILETYPES)
+
+
+def _encode_file_b64(path):
+    """Returns the base64 encoded content of `path`
+
+    The file is read rather than memory-mapped: a mapped file that shrinks
+    while it is encoded, like a log truncated in place, raises SIGBUS and
+    kills the process, where a read just comes back short.
+    """
+    with open(file=path, mode="rb") as f:
+        return get_base64_value(f.read())
+
+
+def _compile_pattern(pattern):
+    """Splits a glob `pattern` into one selector per path component
+
+    Follows `Path.glob`: empty and `.` components are dropped, `**` becomes
+    `RECURSIVE`, components with wildcards become compiled matchers and the
+    others, `..` included, stay literal names. A trailing `/` only matches
+    directories, so such a pattern never matches a file and `None` is
+    returned.
+    """
+    if pattern.startswith("/"):
+        raise ValueError(f"Non-relative patterns are unsupported: {pattern}")
+
+    selectors = []
+    for part in pattern.split("/"):
+        if not part or part == ".":
+            continue
+        if part == "**":
+            selectors.append(RECURSIVE)
+        elif "**" in part:
+            raise ValueError(
+                f"Invalid pattern: '**' can only be an entire path component: {pattern}"
+            )
+        elif "*" in part or "?" in part or "[" in part:
+            selectors.append(re.compile(fnmatch.translate(part)).fullmatch)
+        else:
+            selectors.append(part)
+
+    if not selectors:
+        raise ValueError(f"Unacceptable pattern: {pattern!r}")
+    if pattern.endswith("/") or selectors[-1] is RECURSIVE:
+        return None
+
+    return selectors
 
 
 class DirectoryDataSource(BaseDataSource):
@@ -55,51 +110,135 @@ class DirectoryDataSource(BaseDataSource):
         return True
 
     def get_id(self, path):
-        return hashlib.md5(str(path).encode("utf8")).hexdigest()
+        # the id is not used for anything security-related, so a 128-bit
+        # BLAKE2b digest is enough and cheaper to compute than md5
+        return hashlib.blake2b(str(path).encode("utf8"), digest_size=16).hexdigest()
 
-    async def _download(self, path, timestamp=None, doit=None):
-        if not (doit and os.path.splitext(path)[-1] in TIKA_SUPPORTED_FILETYPES):
+    async def _download(self, path, doc_id, timestamp=None, doit=None):
+        if not doit:
             return
 
-        self._logger.info(f"Reading {path}")
-        with open(file=path, mode="rb") as f:
-            return {
-                "_id": self.get_id(path),
-                "_timestamp": timestamp,
-                "_attachment": get_base64_value(f.read()),
-            }
+        self._logger.debug("Reading %s", path)
+        return {
+            "_id": doc_id,
+            "_timestamp": timestamp,
+            "_attachment": await asyncio.to_thread(_encode_file_b64, path),
+        }
+
+    def _scandir(self, directory):
+        try:
+            with os.scandir(directory) as entries:
+                return list(entries)
+        except OSError as e:
+            self._logger.warning(f"Skipping {directory}: {e}")
+            return []
+
+    def _scan(self):
+        """Yields `(path, stat)` for every file matching the pattern
+
+        This walks the tree the way `Path.glob` does, but with `os.scandir`,
+        so the file type comes with the listing and the stat of the matching
+        entries is cached on the `os.DirEntry`. Literal components are joined
+        without listing their parent, and directories are only entered while
+        the rest of the pattern can still match under them. Symlinked
+        directories are followed, except when reached through `**`.
+        """
+        # compiled once per sync instead of matching the glob for every file
+        selectors = _compile_pattern(self.pattern)
+        if selectors is None:
+            return
+
+        last = len(selectors) - 1
+        # with more than one `**` the same directory can be reached twice
+        seen = set() if selectors.count(RECURSIVE) > 1 else None
+        pending = [(self.directory, 0)]
+
+        while pending:
+            directory, index = pending.pop()
+            if seen is not None:
+                if (directory, index) in seen:
+                    continue
+                seen.add((directory, index))
+
+            selector = selectors[index]
+            if selector is RECURSIVE:
+                # the rest of the pattern applies to this directory and to
+                # every directory under it
+                pending.append((directory, index + 1))
+                for entry in self._scandir(directory):
+                    if entry.is_dir() and not entry.is_symlink():
+                        pending.append((entry.path, index))
+            elif isinstance(selector, str):
+                path = os.path.join(directory, selector)
+                if index < last:
+                    if os.path.isdir(path):
+                        pending.append((path, index + 1))
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat_module.S_ISREG(stat.st_mode):
+                    yield path, stat
+            else:
+                for entry in self._scandir(directory):
+                    if not selector(entry.name):
+                        continue
+                    if index < last:
+                        if entry.is_dir():
+                            pending.append((entry.path, index + 1))
+                    elif entry.is_file():
+                        yield entry.path, entry.stat()
+
+    def _get_doc(self, path, stat):
+        doc_id = self.get_id(path)
+
+        # download coroutine, only for files Tika can extract content from
+        if os.path.splitext(path)[-1].lower() in SUPPORTED_EXTENSIONS:
+            download_coro = functools.partial(self._download, path, doc_id)
+        else:
+            download_coro = None
+
+        # get the last modified value of the file, as the ISO string the
+        # datetime would be serialized to anyway
+        ts = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
+        # the first 7 fields of the stat tuple, the times at indices 7-9 are
+        # truncated to ints so the float attributes are used for those
+        mode, ino, dev, nlink, uid, gid, size = stat[:7]
+
+        # send back as a doc
+        doc = {
+            "path": path,
+            "last_modified_time": ts,
+            "inode_protection_mode": mode,
+            "inode_number": ino,
+            "device_inode_reside": dev,
+            "number_of_links": nlink,
+            "uid": uid,
+            "gid": gid,
+            "ctime": stat.st_ctime,
+            "last_access_time": stat.st_atime,
+            "size": size,
+            "_timestamp": ts,
+            "_id": doc_id,
+        }
+
+        return doc, download_coro
+
+    def _get_docs_batch(self, files):
+        """Returns the docs for the next `SCAN_BATCH_SIZE` of `files`
+
+        This blocks on the file system, call it through `asyncio.to_thread`.
+        """
+        return [
+            self._get_doc(path, stat)
+            for path, stat in itertools.islice(files, SCAN_BATCH_SIZE)
+        ]
 
     async def get_docs(self, filtering=None):
         self._logger.debug(f"Reading {self.directory}...")
-        root_directory = Path(self.directory)
-
-        for path_object in root_directory.glob(self.pattern):
-            if not path_object.is_file():
-                continue
-
-            # download coroutine
-            download_coro = functools.partial(self._download, str(path_object))
-
-            # get the last modified value of the file
-            stat = path_object.stat()
-            ts = stat.st_mtime
-            ts = datetime.fromtimestamp(ts, tz=timezone.utc)
-
-            # send back as a doc
-            doc = {
-                "path": str(path_object),
-                "last_modified_time": ts,
-                "inode_protection_mode": stat.st_mode,
-                "inode_number": stat.st_ino,
-                "device_inode_reside": stat.st_dev,
-                "number_of_links": stat.st_nlink,
-                "uid": stat.st_uid,
-                "gid": stat.st_gid,
-                "ctime": stat.st_ctime,
-                "last_access_time": stat.st_atime,
-                "size": stat.st_size,
-                "_timestamp": ts.isoformat(),
-                "_id": self.get_id(path_object),
-            }
-
-            yield doc, download_coro
+        files = self._scan()
+
+        while batch := await asyncio.to_thread(self._get_docs_batch, files):
+            for doc, download_coro in batch:
+                yield doc, download_coro
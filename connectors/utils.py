@@ -26,6 +26,12 @@ from pympler import asizeof
 
 from connectors.logger import logger
 
+try:
+    # SIMD-accelerated drop-in for the stdlib encoder, see the `fast` extra
+    import pybase64 as _base64_encoder
+except ImportError:
+    _base64_encoder = base64
+
 ACCESS_CONTROL_INDEX_PREFIX = ".search-acl-filter-"
 DEFAULT_CHUNK_SIZE = 500
 DEFAULT_QUEUE_SIZE = 1024
@@ -147,7 +153,7 @@ def get_base64_value(content):
     Args:
            content (byte): Object content in bytes
     """
-    return base64.b64encode(content).decode("utf-8")
+    return _base64_encoder.b64encode(content).decode("utf-8")
 
 
 def decode_base64_value(content):
@@ -95,6 +95,10 @@ setup(
     zip_safe=False,
     classifiers=classifiers,
     install_requires=install_requires,
+    extras_require={
+        # faster base64 encoding of downloaded content
+        "fast": ["pybase64"],
+    },
     entry_points="""
       [console_scripts]
       elastic-ingest = connectors.cli:main
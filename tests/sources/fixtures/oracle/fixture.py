@@ -5,22 +5,28 @@
 #
 """Oracle module responsible to generate records on the Oracle server.
 """
-import asyncio
 import os
 import random
 import string
+import time
 
 import oracledb
 
-from connectors.utils import RetryStrategy, retryable
-
 DATA_SIZE = os.environ.get("DATA_SIZE", "small").lower()
 _SIZES = {"small": 5, "medium": 10, "large": 30}
 NUM_TABLES = _SIZES[DATA_SIZE]
+RECORD_COUNT = 10000
 
 # If the Oracle Service takes too much time to respond, modify the following retry constants accordingly.
 RETRY_INTERVAL = 4
 RETRIES = 5
+MAX_RETRY_INTERVAL = 60
+
+
+# maps every byte value to one of the 36 characters used in the record content
+_ALPHABET_TABLE = bytes(
+    (string.ascii_uppercase + string.digits).encode()[i % 36] for i in range(256)
+)
 
 
 def random_text(k=1024 * 20):
@@ -29,7 +35,7 @@ def random_text(k=1024 * 20):
     Args:
         k (int): Length to generate the string
     """
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=k))
+    return random.randbytes(k).translate(_ALPHABET_TABLE).decode()
 
 
 BIG_TEXT = random_text()
@@ -38,55 +44,57 @@ PASSWORD = "Password_123"
 ENCODING = "UTF-8"
 DSN = "(DESCRIPTION=(ADDRESS=(PROTOCOL=TCP)(HOST=127.0.0.1)(PORT=9090))(CONNECT_DATA=(SID=xe)))"
 
+# every table gets the same records, so the row tuples are built only once
+ROWS = [
+    (row_id + 1, f"user_{row_id}", row_id, BIG_TEXT) for row_id in range(RECORD_COUNT)
+]
+
 
-def inject_lines(table, cursor, start, lines):
-    """Ingest rows in table
+def inject_lines(table, cursor):
+    """Ingest the `RECORD_COUNT` rows in table
 
     Args:
         table (str): Name of table
         cursor (cursor): Cursor to execute query
-        start (int): Starting row
-        lines (int): Number of rows
     """
-    rows = []
-    for row_id in range(lines):
-        row_id += start
-        rows.append((row_id + 1, f"user_{row_id}", row_id, BIG_TEXT))
     sql_query = f"INSERT into customers_{table} VALUES (:1, :2, :3, :4)"
-    cursor.executemany(sql_query, rows)
+    cursor.executemany(sql_query, ROWS)
+
+
+def load_rows():
+    """N tables of 10000 rows each. each row is ~ 1024*20 bytes"""
+    connection = oracledb.connect(
+        user="system", password=PASSWORD, dsn=DSN, encoding=ENCODING
+    )
+    cursor = connection.cursor()
+    cursor.execute("CREATE USER admin IDENTIFIED by Password_123")
+    cursor.execute("GRANT CONNECT, RESOURCE, DBA TO admin")
+    connection.commit()
+
+    # create the tables in the admin schema without reconnecting as admin
+    cursor.execute(f"ALTER SESSION SET CURRENT_SCHEMA = {USER}")
+    for table in range(NUM_TABLES):
+        print(f"Adding data from table #{table}...")
+        sql_query = f"CREATE TABLE customers_{table} (id int, name VARCHAR(255), age int, description long, PRIMARY KEY (id))"
+        cursor.execute(sql_query)
+        inject_lines(table, cursor)
+    connection.commit()
 
 
 def load():
     """Generate tables and loads table data in the oracle server."""
-
-    @retryable(
-        retries=RETRIES,
-        interval=RETRY_INTERVAL,
-        strategy=RetryStrategy.EXPONENTIAL_BACKOFF,
-    )
-    async def load_rows():
-        """N tables of 10000 rows each. each row is ~ 1024*20 bytes"""
-        connection = oracledb.connect(
-            user="system", password=PASSWORD, dsn=DSN, encoding=ENCODING
-        )
-        cursor = connection.cursor()
-        cursor.execute("CREATE USER admin IDENTIFIED by Password_123")
-        cursor.execute("GRANT CONNECT, RESOURCE, DBA TO admin")
-        connection.commit()
-
-        connection = oracledb.connect(
-            user=USER, password=PASSWORD, dsn=DSN, encoding=ENCODING
-        )
-        cursor = connection.cursor()
-        for table in range(NUM_TABLES):
-            print(f"Adding data from table #{table}...")
-            sql_query = f"CREATE TABLE customers_{table} (id int, name VARCHAR(255), age int, description long, PRIMARY KEY (id))"
-            cursor.execute(sql_query)
-            for i in range(10):
-                inject_lines(table, cursor, i * 1000, 1000)
-        connection.commit()
-
-    asyncio.get_event_loop().run_until_complete(load_rows())
+    for retry in range(1, RETRIES + 1):
+        try:
+            load_rows()
+            return
+        except Exception:
+            if retry == RETRIES:
+                raise
+            # exponential backoff, capped and with jitter
+            time.sleep(
+                min(MAX_RETRY_INTERVAL, RETRY_INTERVAL * 2 ** (retry - 1))
+                + random.random()
+            )
 
 
 def remove():
@@ -96,8 +104,9 @@ def remove():
     )
     cursor = connection.cursor()
 
+    placeholders = ", ".join(f":{i}" for i in range(1, 11))
     for table in range(NUM_TABLES):
-        rows = [(f"user_{row_id}",) for row_id in random.sample(range(1, 1000), 10)]
-        sql_query = f"DELETE from customers_{table} where name=:1"
-        cursor.executemany(sql_query, rows)
+        names = [f"user_{row_id}" for row_id in random.sample(range(1, 1000), 10)]
+        sql_query = f"DELETE from customers_{table} where name IN ({placeholders})"
+        cursor.execute(sql_query, names)
     connection.commit()
@@ -4,20 +4,33 @@
 # you may not use this file except in compliance with the Elastic License 2.0.
 #
 from contextlib import asynccontextmanager
+from copy import deepcopy
+from functools import cache
 
 from connectors.source import DEFAULT_CONFIGURATION, DataSourceConfiguration
 
 
+@cache
+def _default_configuration(klass):
+    return DataSourceConfiguration(klass.get_default_configuration())
+
+
 @asynccontextmanager
 async def create_source(klass, **extras):
-    config = klass.get_default_configuration()
-    for k, v in extras.items():
-        if k in config:
-            config[k].update({"value": v})
-        else:
-            config[k] = DEFAULT_CONFIGURATION.copy() | {"value": v}
-
-    source = klass(configuration=DataSourceConfiguration(config))
+    if extras:
+        config = klass.get_default_configuration()
+        for k, v in extras.items():
+            if k in config:
+                config[k].update({"value": v})
+            else:
+                config[k] = DEFAULT_CONFIGURATION.copy() | {"value": v}
+        configuration = DataSourceConfiguration(config)
+    else:
+        # sources and tests may mutate their configuration, so every source
+        # gets its own copy of the cached default one
+        configuration = deepcopy(_default_configuration(klass))
+
+    source = klass(configuration=configuration)
     try:
         yield source
     finally:
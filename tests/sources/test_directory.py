@@ -3,9 +3,19 @@
 # or more contributor license agreements. Licensed under the Elastic License 2.0;
 # you may not use this file except in compliance with the Elastic License 2.0.
 #
+import base64
+import os
+from pathlib import Path
+from unittest.mock import patch
+
 import pytest
 
-from connectors.sources.directory import DEFAULT_DIR, DirectoryDataSource
+from connectors.sources.directory import (
+    DEFAULT_DIR,
+    SCAN_BATCH_SIZE,
+    DirectoryDataSource,
+    _encode_file_b64,
+)
 from tests.sources.support import assert_basics, create_source
 
 
@@ -20,12 +30,179 @@ async def test_get_docs(catch_stdout):
         num = 0
         async for (doc, dl) in source.get_docs():
             num += 1
-            if doc["path"].endswith("__init__.py"):
+            if doc["path"].endswith("__init__.py") or dl is None:
                 continue
             data = await dl(doit=True, timestamp="xx")
-            if data is not None:
-                assert len(data["_attachment"]) > 0
+            assert data["_id"] == doc["_id"]
+            assert len(data["_attachment"]) > 0
             if num > 100:
                 break
 
         assert num > 3
+
+
+@pytest.mark.parametrize("size", [0, 1, 4096, 1024 * 1024 + 1])
+def test_encode_file_b64(tmp_path, size):
+    content = bytes(i % 256 for i in range(size))
+    path = tmp_path / "file.txt"
+    path.write_bytes(content)
+
+    assert _encode_file_b64(str(path)) == base64.b64encode(content).decode()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="requires procfs")
+def test_encode_file_b64_when_size_is_zero_then_read():
+    with open("/proc/self/status", "rb") as f:
+        content = f.read()
+
+    decoded = base64.b64decode(_encode_file_b64("/proc/self/status"))
+
+    # the status of this process can change between the two reads
+    assert decoded.startswith(content.split(b"\n", 1)[0])
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "**/*.*",
+        "*.txt",
+        "*/*",
+        "sub/**/*.py",
+        "**/.*",
+        "**",
+        "**/",
+        "sub/**",
+        "sub/",
+        "./*.txt",
+        "sub//c.py",
+        "sub/../a.txt",
+        "sub/deeper/d.py",
+        "linkroot/*",
+        "linkroot/**/*.py",
+        "*/*.md",
+        "*/*/*",
+        "**/*.py",
+        "**/**/*.txt",
+        "*/[d-e]*/?.*",
+    ],
+)
+async def test_get_docs_matches_path_glob(tmp_path, pattern):
+    for name in (
+        "a.txt",
+        "b.py",
+        ".hidden.txt",
+        "no_ext",
+        "sub/c.py",
+        "sub/deeper/d.py",
+        "sub/deeper/e.txt",
+        ".git/config.cfg",
+        "outside/f.md",
+        "outside/nested/g.py",
+    ):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+    # a symlinked directory and file, and a dangling symlink
+    (tmp_path / "linkroot").symlink_to(tmp_path / "outside")
+    (tmp_path / "sub" / "link.txt").symlink_to(tmp_path / "a.txt")
+    (tmp_path / "sub" / "dangling.txt").symlink_to(tmp_path / "missing.txt")
+
+    expected = {str(path) for path in Path(tmp_path).glob(pattern) if path.is_file()}
+    async with create_source(
+        DirectoryDataSource, directory=str(tmp_path), pattern=pattern
+    ) as source:
+        paths = {doc["path"] async for doc, _ in source.get_docs()}
+
+    assert paths == expected
+
+
+async def test_get_docs_only_lists_directories_the_pattern_can_match(tmp_path):
+    for name in ("sub/deeper/a.py", "other/nested/b.py"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+
+    async with create_source(
+        DirectoryDataSource, directory=str(tmp_path), pattern="sub/**/*.py"
+    ) as source:
+        with patch("os.scandir", wraps=os.scandir) as scandir:
+            paths = [doc["path"] async for doc, _ in source.get_docs()]
+
+    assert paths == [str(tmp_path / "sub" / "deeper" / "a.py")]
+    listed = {call.args[0] for call in scandir.call_args_list}
+    assert listed == {str(tmp_path / "sub"), str(tmp_path / "sub" / "deeper")}
+
+
+@pytest.mark.parametrize("pattern", ["/*.txt", ".", "a**/*.txt"])
+async def test_get_docs_rejects_invalid_pattern(tmp_path, pattern):
+    async with create_source(
+        DirectoryDataSource, directory=str(tmp_path), pattern=pattern
+    ) as source:
+        with pytest.raises(ValueError):
+            async for _ in source.get_docs():
+                pass
+
+
+async def test_get_docs_across_batches(tmp_path):
+    num_files = SCAN_BATCH_SIZE * 2 + 1
+    for i in range(num_files):
+        (tmp_path / f"{i}.txt").write_text(str(i))
+
+    async with create_source(DirectoryDataSource, directory=str(tmp_path)) as source:
+        ids = {doc["_id"] async for doc, _ in source.get_docs()}
+
+    assert len(ids) == num_files
+
+
+async def test_get_docs_skips_download_for_unsupported_files(tmp_path):
+    for name in ("a.txt", "b.PY", "c.bin", "no_ext"):
+        (tmp_path / name).write_text(name)
+
+    async with create_source(DirectoryDataSource, directory=str(tmp_path)) as source:
+        downloadable = {
+            os.path.basename(doc["path"]): dl is not None
+            async for doc, dl in source.get_docs()
+        }
+
+    assert downloadable == {"a.txt": True, "b.PY": True, "c.bin": False}
+
+
+async def test_get_docs_timestamps(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("a")
+    os.utime(path, (0, 1672531200))
+
+    async with create_source(DirectoryDataSource, directory=str(tmp_path)) as source:
+        docs = [doc async for doc, _ in source.get_docs()]
+
+    assert docs[0]["last_modified_time"] == "2023-01-01T00:00:00+00:00"
+    assert docs[0]["_timestamp"] == "2023-01-01T00:00:00+00:00"
+
+
+async def test_get_docs_hashes_each_path_once(tmp_path):
+    for name in ("a.txt", "b.md", "c.bin"):
+        (tmp_path / name).write_text(name)
+
+    async with create_source(DirectoryDataSource, directory=str(tmp_path)) as source:
+        with patch.object(source, "get_id", wraps=source.get_id) as get_id:
+            async for _, dl in source.get_docs():
+                if dl is not None:
+                    await dl(doit=True, timestamp="xx")
+
+    assert get_id.call_count == 3
+
+
+async def test_get_docs_stat_fields(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("content")
+    stat = path.stat()
+
+    async with create_source(DirectoryDataSource, directory=str(tmp_path)) as source:
+        docs = [doc async for doc, _ in source.get_docs()]
+
+    assert docs[0]["inode_protection_mode"] == stat.st_mode
+    assert docs[0]["inode_number"] == stat.st_ino
+    assert docs[0]["device_inode_reside"] == stat.st_dev
+    assert docs[0]["number_of_links"] == stat.st_nlink
+    assert docs[0]["uid"] == stat.st_uid
+    assert docs[0]["gid"] == stat.st_gid
+    assert docs[0]["ctime"] == stat.st_ctime
+    assert docs[0]["size"] == 7
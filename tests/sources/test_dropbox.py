@@ -4,12 +4,14 @@
 # you may not use this file except in compliance with the Elastic License 2.0.
 #
 """Tests the Dropbox source class methods"""
+import base64
 import json
 from unittest import mock
 from unittest.mock import ANY, AsyncMock, Mock, patch
 
 import aiohttp
 import pytest
+import pytest_asyncio
 from aiohttp import StreamReader
 from aiohttp.client_exceptions import ClientResponseError, ServerDisconnectedError
 from freezegun import freeze_time
@@ -38,6 +40,8 @@ HOST_URLS = {
     "DOWNLOAD_HOST_URL": "https://content.dropboxapi.com/2/",
 }
 PING = "users/get_current_account"
+NULL_JSON = json.dumps(None)
+REQUEST_INFO = aiohttp.RequestInfo(real_url="", method=None, headers=None, url="")
 
 MOCK_CURRENT_USER = {
     "account_id": "acc_id:1234",
@@ -98,7 +102,7 @@ MOCK_FILES_FOLDERS_CONTINUE = {
     "has_more": False,
 }
 
-EXPECTED_FILES_FOLDERS = [
+EXPECTED_FILES_FOLDERS = (
     {
         "_id": "id:1",
         "type": "Folder",
@@ -115,7 +119,7 @@ EXPECTED_FILES_FOLDERS = [
         "size": 200,
         "_timestamp": "2023-01-01T06:06:06Z",
     },
-]
+)
 
 MOCK_SHARED_FILES = {
     "entries": [
@@ -163,7 +167,7 @@ MOCK_RECEIVED_FILE_METADATA_2 = {
     "url": "https://www.dropbox.com/scl/fi/a1xtoxyu0ux73pd7e77ul/index2.py?dl=0",
 }
 
-EXPECTED_SHARED_FILES = [
+EXPECTED_SHARED_FILES = (
     {
         "_id": "id:1",
         "type": "File",
@@ -180,7 +184,8 @@ EXPECTED_SHARED_FILES = [
         "size": 200,
         "_timestamp": "2023-01-01T06:06:06Z",
     },
-]
+)
+EXPECTED_ALL = (*EXPECTED_FILES_FOLDERS, *EXPECTED_SHARED_FILES)
 
 MOCK_ATTACHMENT = {
     "id": "id:1",
@@ -202,51 +207,11 @@ MOCK_PAPER_FILE = {
     "path_display": "/test/dummy_file.paper",
 }
 
-SKIPPED_ATTACHMENT = {
-    "id": "id:1",
-    "name": "dummy_file.txt",
-    "server_modified": "2023-01-01T06:06:06Z",
-    "size": 200,
-    "url": "https://www.dropbox.com/scl/fi/a1xtoxyu0ux73pd7e77ul/dummy_file.txt?dl=0",
-    "is_downloadable": False,
-    "path_display": "/test/dummy_file.txt",
-}
-
-MOCK_ATTACHMENT_WITHOUT_EXTENSION = {
-    "id": "id:1",
-    "name": "dummy_file",
-    "server_modified": "2023-01-01T06:06:06Z",
-    "size": 200,
-    "url": "https://www.dropbox.com/scl/fi/a1xtoxyu0ux73pd7e77ul/dummy_file?dl=0",
-    "is_downloadable": False,
-    "path_display": "/test/dummy_file",
-}
-
-MOCK_ATTACHMENT_WITH_LARGE_DATA = {
-    "id": "id:1",
-    "name": "dummy_file.txt",
-    "server_modified": "2023-01-01T06:06:06Z",
-    "size": 23000000,
-    "url": "https://www.dropbox.com/scl/fi/a1xtoxyu0ux73pd7e77ul/dummy_file.txt?dl=0",
-    "is_downloadable": True,
-    "path_display": "/test/dummy_file.txt",
-}
-
-MOCK_ATTACHMENT_WITH_UNSUPPORTED_EXTENSION = {
-    "id": "id:1",
-    "name": "dummy_file.xyz",
-    "server_modified": "2023-01-01T06:06:06Z",
-    "size": 23000000,
-    "url": "https://www.dropbox.com/scl/fi/a1xtoxyu0ux73pd7e77ul/dummy_file.xyz?dl=0",
-    "is_downloadable": True,
-    "path_display": "/test/dummy_file.xyz",
-}
-
-RESPONSE_CONTENT = "# This is the dummy file"
+RESPONSE_CONTENT = b"# This is the dummy file"
 EXPECTED_CONTENT = {
     "_id": "id:1",
     "_timestamp": "2023-01-01T06:06:06Z",
-    "_attachment": "IyBUaGlzIGlzIHRoZSBkdW1teSBmaWxl",
+    "_attachment": base64.b64encode(RESPONSE_CONTENT).decode(),
 }
 
 MOCK_SEARCH_FILE_1 = {
@@ -312,34 +277,39 @@ MOCK_SEARCH_FILE_3 = {
 }
 
 
-class JSONAsyncMock(AsyncMock):
-    def __init__(self, json, status, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+class MockResponse:
+    """Mock class for ClientResponse"""
+
+    def __init__(self, json, status):
         self._json = json
         self.status = status
 
     async def json(self):
         return self._json
 
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
 
-class StreamReaderAsyncMock(AsyncMock):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+class MockObjectResponse:
+    """Mock class for a ClientResponse streaming its content"""
+
+    def __init__(self):
         self.content = StreamReader
 
+    async def __aenter__(self):
+        return self
 
-def get_json_mock(mock_response, status):
-    async_mock = AsyncMock()
-    async_mock.__aenter__ = AsyncMock(
-        return_value=JSONAsyncMock(json=mock_response, status=status)
-    )
-    return async_mock
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
 
 
-def get_stream_reader():
-    async_mock = AsyncMock()
-    async_mock.__aenter__ = AsyncMock(return_value=StreamReaderAsyncMock())
-    return async_mock
+async def async_generator(item):
+    """Yields `item` once"""
+    yield item
 
 
 def setup_dropbox(source):
@@ -349,246 +319,192 @@ def setup_dropbox(source):
     source.configuration.get_field("refresh_token").value = "abc#123"
 
 
-@pytest.mark.asyncio
+@pytest_asyncio.fixture
+async def source():
+    async with create_source(DropboxDataSource) as source:
+        setup_dropbox(source)
+        yield source
+
+
+@pytest.fixture
+def patch_access_token(source):
+    source.dropbox_client._set_access_token = AsyncMock()
+
+
+@pytest.fixture(autouse=True)
+def mock_post():
+    with patch.object(aiohttp.ClientSession, "post") as post:
+        yield post
+
+
 @pytest.mark.parametrize(
     "field",
     ["app_key", "app_secret", "refresh_token"],
 )
-async def test_validate_configuration_with_empty_fields_then_raise_exception(field):
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.configuration.get_field(field).value = ""
+async def test_validate_configuration_with_empty_fields_then_raise_exception(
+    field, source
+):
+    source.dropbox_client.configuration.get_field(field).value = ""
 
-        with pytest.raises(ConfigurableFieldValueError):
-            await source.validate_config()
+    with pytest.raises(ConfigurableFieldValueError):
+        await source.validate_config()
 
 
-@pytest.mark.asyncio
-async def test_validate_configuration_with_valid_path():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.configuration.get_field("path").value = "/shared"
+async def test_validate_configuration_with_valid_path(source, mock_post):
+    source.dropbox_client.configuration.get_field("path").value = "/shared"
+    mock_post.return_value = MockResponse(json=MOCK_CHECK_PATH, status=200)
 
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            return_value=JSONAsyncMock(json=MOCK_CHECK_PATH, status=200),
-        ):
-            await source.validate_config()
+    await source.validate_config()
 
 
-@pytest.mark.asyncio
 @patch("connectors.utils.time_to_sleep_between_retries", Mock(return_value=0))
-async def test_validate_configuration_with_invalid_path_then_raise_exception():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.path = "/abc"
-
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            side_effect=ClientResponseError(
-                status=409,
-                request_info=aiohttp.RequestInfo(
-                    real_url="", method=None, headers=None, url=""
-                ),
-                history=None,
-            ),
-        ):
-            with pytest.raises(
-                InvalidPathException, match="Configured Path: /abc is invalid"
-            ):
-                await source.validate_config()
+async def test_validate_configuration_with_invalid_path_then_raise_exception(
+    source, mock_post
+):
+    source.dropbox_client.path = "/abc"
+    mock_post.side_effect = ClientResponseError(
+        status=409,
+        request_info=REQUEST_INFO,
+        history=None,
+    )
 
+    with pytest.raises(InvalidPathException, match="Configured Path: /abc is invalid"):
+        await source.validate_config()
 
-@pytest.mark.asyncio
-async def test_set_access_token():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            return_value=get_json_mock(mock_response=MOCK_ACCESS_TOKEN, status=200),
-        ):
-            await source.dropbox_client._set_access_token()
-            assert source.dropbox_client.access_token == "test2344"
+
+async def test_set_access_token(source, mock_post):
+    mock_post.return_value = MockResponse(json=MOCK_ACCESS_TOKEN, status=200)
+
+    await source.dropbox_client._set_access_token()
+    assert source.dropbox_client.access_token == "test2344"
 
 
-@pytest.mark.asyncio
 @patch("connectors.utils.time_to_sleep_between_retries", Mock(return_value=0))
-async def test_set_access_token_with_incorrect_app_key_then_raise_exception():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
+async def test_set_access_token_with_incorrect_app_key_then_raise_exception(
+    source, mock_post
+):
+    mock_post.return_value = MockResponse(
+        json=MOCK_ACCESS_TOKEN_FOR_INVALID_APP_KEY, status=400
+    )
 
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            return_value=get_json_mock(
-                mock_response=MOCK_ACCESS_TOKEN_FOR_INVALID_APP_KEY, status=400
-            ),
-        ):
-            with pytest.raises(
-                InvalidClientCredentialException,
-                match="Configured App Key or App Secret is invalid.",
-            ):
-                await source.dropbox_client._set_access_token()
+    with pytest.raises(
+        InvalidClientCredentialException,
+        match="Configured App Key or App Secret is invalid.",
+    ):
+        await source.dropbox_client._set_access_token()
 
 
-@pytest.mark.asyncio
 @patch("connectors.utils.time_to_sleep_between_retries", Mock(return_value=0))
-async def test_set_access_token_with_incorrect_refresh_token_then_raise_exception():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
+async def test_set_access_token_with_incorrect_refresh_token_then_raise_exception(
+    source, mock_post
+):
+    mock_post.return_value = MockResponse(
+        json=MOCK_ACCESS_TOKEN_FOR_INVALID_REFRESH_TOKEN, status=400
+    )
 
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            return_value=get_json_mock(
-                mock_response=MOCK_ACCESS_TOKEN_FOR_INVALID_REFRESH_TOKEN, status=400
-            ),
-        ):
-            with pytest.raises(
-                InvalidRefreshTokenException,
-                match="Configured Refresh Token is invalid.",
-            ):
-                await source.dropbox_client._set_access_token()
+    with pytest.raises(
+        InvalidRefreshTokenException,
+        match="Configured Refresh Token is invalid.",
+    ):
+        await source.dropbox_client._set_access_token()
 
 
-@pytest.mark.asyncio
-async def test_tweak_bulk_options():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.concurrent_downloads = 10
-        options = {"concurrent_downloads": 5}
+async def test_tweak_bulk_options(source):
+    source.concurrent_downloads = 10
+    options = {"concurrent_downloads": 5}
 
-        source.tweak_bulk_options(options)
-        assert options["concurrent_downloads"] == 10
+    source.tweak_bulk_options(options)
+    assert options["concurrent_downloads"] == 10
 
 
-@pytest.mark.asyncio
-async def test_close_with_client_session():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        _ = source.dropbox_client._get_session
+async def test_close_with_client_session(source):
+    _ = source.dropbox_client._get_session
 
-        await source.close()
-        assert hasattr(source.dropbox_client.__dict__, "_get_session") is False
+    await source.close()
+    assert hasattr(source.dropbox_client.__dict__, "_get_session") is False
 
 
-@pytest.mark.asyncio
-async def test_ping():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client._set_access_token = AsyncMock()
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            return_value=get_json_mock(MOCK_CURRENT_USER, 200),
-        ):
-            await source.ping()
+async def test_ping(source, mock_post, patch_access_token):
+    mock_post.return_value = MockResponse(MOCK_CURRENT_USER, 200)
+
+    await source.ping()
 
 
-@pytest.mark.asyncio
 @patch("connectors.sources.dropbox.RETRY_INTERVAL", 0)
-async def test_api_call_negative():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.retry_count = 4
-        source.dropbox_client._set_access_token = AsyncMock()
+async def test_api_call_negative(source, mock_post, patch_access_token):
+    source.dropbox_client.retry_count = 4
 
-        with patch.object(
-            aiohttp.ClientSession, "post", side_effect=Exception("Something went wrong")
-        ):
-            with pytest.raises(Exception):
-                await anext(
-                    source.dropbox_client.api_call(
-                        base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
-                        url_name=PING,
-                        data=json.dumps(None),
-                    )
-                )
-
-        with patch.object(
-            aiohttp.ClientSession, "post", side_effect=ServerDisconnectedError()
-        ):
-            with pytest.raises(Exception):
-                await anext(
-                    source.dropbox_client.api_call(
-                        base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
-                        url_name=PING,
-                        data=json.dumps(None),
-                    )
-                )
-
-
-@pytest.mark.asyncio
-async def test_api_call():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client._set_access_token = AsyncMock()
+    mock_post.side_effect = Exception("Something went wrong")
+    with pytest.raises(Exception):
+        await anext(
+            source.dropbox_client.api_call(
+                base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
+                url_name=PING,
+                data=NULL_JSON,
+            )
+        )
 
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            return_value=get_json_mock(MOCK_CURRENT_USER, 200),
-        ):
-            EXPECTED_RESPONSE = {
-                "account_id": "acc_id:1234",
-                "name": {
-                    "given_name": "John",
-                    "surname": "Wilber",
-                    "display_name": "John Wilber",
-                    "abbreviated_name": "JW",
-                },
-                "email": "john.wilber@abcd.com",
-                "country": "US",
-            }
-            response = await anext(
-                source.dropbox_client.api_call(
-                    base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
-                    url_name=PING,
-                    data=json.dumps(None),
-                )
+    mock_post.side_effect = ServerDisconnectedError()
+    with pytest.raises(Exception):
+        await anext(
+            source.dropbox_client.api_call(
+                base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
+                url_name=PING,
+                data=NULL_JSON,
             )
-            actual_response = await response.json()
-            assert actual_response == EXPECTED_RESPONSE
+        )
 
 
-@pytest.mark.asyncio
-async def test_paginated_api_call_when_skipping_api_call():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.retry_count = 1
-        source.dropbox_client._set_access_token = AsyncMock()
+async def test_api_call(source, mock_post, patch_access_token):
+    mock_post.return_value = MockResponse(MOCK_CURRENT_USER, 200)
 
-        with patch.object(
-            source.dropbox_client,
-            "api_call",
-            side_effect=Exception("Something went wrong"),
+    EXPECTED_RESPONSE = {
+        "account_id": "acc_id:1234",
+        "name": {
+            "given_name": "John",
+            "surname": "Wilber",
+            "display_name": "John Wilber",
+            "abbreviated_name": "JW",
+        },
+        "email": "john.wilber@abcd.com",
+        "country": "US",
+    }
+    response = await anext(
+        source.dropbox_client.api_call(
+            base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
+            url_name=PING,
+            data=NULL_JSON,
+        )
+    )
+    actual_response = await response.json()
+    assert actual_response == EXPECTED_RESPONSE
+
+
+async def test_paginated_api_call_when_skipping_api_call(source, patch_access_token):
+    source.dropbox_client.retry_count = 1
+
+    with patch.object(
+        source.dropbox_client,
+        "api_call",
+        side_effect=Exception("Something went wrong"),
+    ):
+        async for response in source.dropbox_client._paginated_api_call(
+            base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
+            breaking_field="xyz",
+            continue_endpoint="shared_file",
+            data={"data": "xyz"},
+            url_name="url_name",
         ):
-            async for response in source.dropbox_client._paginated_api_call(
-                base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
-                breaking_field="xyz",
-                continue_endpoint="shared_file",
-                data={"data": "xyz"},
-                url_name="url_name",
-            ):
-                assert response is None
+            assert response is None
 
 
-@pytest.mark.asyncio
-async def test_set_access_token_when_token_expires_at_is_str():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.token_expiration_time = "2023-02-10T09:02:23.629821"
-        mock_token = {"access_token": "test2344", "expires_in": "1234555"}
-        async_response_token = get_json_mock(mock_token, 200)
+async def test_set_access_token_when_token_expires_at_is_str(source, mock_post):
+    source.dropbox_client.token_expiration_time = "2023-02-10T09:02:23.629821"
+    mock_token = {"access_token": "test2344", "expires_in": "1234555"}
+    mock_post.return_value = MockResponse(mock_token, 200)
 
-        with patch.object(
-            aiohttp.ClientSession, "post", return_value=async_response_token
-        ):
-            actual_response = await source.dropbox_client._set_access_token()
-            assert actual_response is None
+    actual_response = await source.dropbox_client._set_access_token()
+    assert actual_response is None
 
 
 @pytest.fixture
@@ -597,226 +513,199 @@ def patch_default_wait_multiplier():
         yield
 
 
-@pytest.mark.asyncio
 @patch("connectors.utils.time_to_sleep_between_retries", Mock(return_value=0))
-async def test_api_call_when_token_is_expired():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
+async def test_api_call_when_token_is_expired(source, mock_post):
+    mock_post.side_effect = [
+        ClientResponseError(
+            status=401,
+            request_info=REQUEST_INFO,
+            history=None,
+            message="Unauthorized",
+        ),
+        MockResponse(MOCK_ACCESS_TOKEN, 200),
+        MockResponse(MOCK_FILES_FOLDERS, 200),
+    ]
+
+    actual_response = await anext(
+        source.dropbox_client.api_call(
+            base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
+            url_name=PING,
+            data=NULL_JSON,
+        )
+    )
+    actual_response = await actual_response.json()
+    assert actual_response == MOCK_FILES_FOLDERS
 
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            side_effect=[
-                ClientResponseError(
-                    status=401,
-                    request_info=aiohttp.RequestInfo(
-                        real_url="", method=None, headers=None, url=""
-                    ),
-                    history=None,
-                    message="Unauthorized",
-                ),
-                get_json_mock(MOCK_ACCESS_TOKEN, 200),
-                get_json_mock(MOCK_FILES_FOLDERS, 200),
-            ],
-        ):
-            actual_response = await anext(
-                source.dropbox_client.api_call(
-                    base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
-                    url_name=PING,
-                    data=json.dumps(None),
-                )
-            )
-            actual_response = await actual_response.json()
-            assert actual_response == MOCK_FILES_FOLDERS
 
+async def test_api_call_when_status_429_exception(
+    source, mock_post, patch_access_token
+):
+    mock_post.side_effect = [
+        ClientResponseError(
+            status=429,
+            headers={"Retry-After": 0},
+            request_info=REQUEST_INFO,
+            history=(),
+        ),
+        MockResponse(MOCK_FILES_FOLDERS, 200),
+    ]
+
+    _ = source.dropbox_client._get_session
+    response = await anext(
+        source.dropbox_client.api_call(
+            base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
+            url_name=PING,
+            data=NULL_JSON,
+        )
+    )
+    actual_response = await response.json()
+    assert actual_response == MOCK_FILES_FOLDERS
 
-@pytest.mark.asyncio
-async def test_api_call_when_status_429_exception():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client._set_access_token = AsyncMock()
-
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            side_effect=[
-                ClientResponseError(
-                    status=429,
-                    headers={"Retry-After": 0},
-                    request_info=aiohttp.RequestInfo(
-                        real_url="", method=None, headers=None, url=""
-                    ),
-                    history=(),
-                ),
-                get_json_mock(MOCK_FILES_FOLDERS, 200),
-            ],
-        ):
-            _ = source.dropbox_client._get_session
-            response = await anext(
-                source.dropbox_client.api_call(
-                    base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
-                    url_name=PING,
-                    data=json.dumps(None),
-                )
+
+@patch("connectors.sources.dropbox.DEFAULT_RETRY_AFTER", 0)
+async def test_api_call_when_status_429_exception_without_retry_after_header(
+    source, mock_post, patch_access_token
+):
+    source.dropbox_client.retry_count = 1
+    mock_post.side_effect = ClientResponseError(
+        status=429,
+        headers={},
+        request_info=REQUEST_INFO,
+        history=(),
+    )
+
+    _ = source.dropbox_client._get_session
+    with pytest.raises(ClientResponseError):
+        await anext(
+            source.dropbox_client.api_call(
+                base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
+                url_name=PING,
+                data=NULL_JSON,
             )
-            actual_response = await response.json()
-            assert actual_response == MOCK_FILES_FOLDERS
+        )
+
+
+@pytest.fixture
+def patch_download(mock_post):
+    mock_post.return_value = MockObjectResponse()
+    with mock.patch(
+        "aiohttp.StreamReader.iter_chunked",
+        return_value=async_generator(RESPONSE_CONTENT),
+    ):
+        yield
 
 
-@pytest.mark.asyncio
-@patch("connectors.sources.dropbox.DEFAULT_RETRY_AFTER", 0)
-async def test_api_call_when_status_429_exception_without_retry_after_header():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.retry_count = 1
-
-        source.dropbox_client._set_access_token = AsyncMock()
-
-        with patch.object(
-            aiohttp.ClientSession,
-            "post",
-            side_effect=ClientResponseError(
-                status=429,
-                headers={},
-                request_info=aiohttp.RequestInfo(
-                    real_url="", method=None, headers=None, url=""
-                ),
-                history=(),
-            ),
-        ):
-            _ = source.dropbox_client._get_session
-            with pytest.raises(ClientResponseError):
-                await anext(
-                    source.dropbox_client.api_call(
-                        base_url=HOST_URLS["FILES_FOLDERS_HOST_URL"],
-                        url_name=PING,
-                        data=json.dumps(None),
-                    )
-                )
-
-
-@pytest.mark.asyncio
 @pytest.mark.parametrize(
-    "attachment, is_shared, expected_content",
+    "attachment, is_shared",
     [
-        (MOCK_ATTACHMENT, False, EXPECTED_CONTENT),
-        (MOCK_PAPER_FILE, False, EXPECTED_CONTENT),
-        (MOCK_ATTACHMENT, True, EXPECTED_CONTENT),
-        (MOCK_ATTACHMENT_WITHOUT_EXTENSION, False, None),
-        (MOCK_ATTACHMENT_WITH_LARGE_DATA, False, None),
-        (MOCK_ATTACHMENT_WITH_UNSUPPORTED_EXTENSION, False, None),
-        (SKIPPED_ATTACHMENT, False, None),
+        (MOCK_ATTACHMENT, False),
+        (MOCK_ATTACHMENT, True),
+        (MOCK_PAPER_FILE, False),
     ],
 )
-async def test_get_content_when_is_downloadable_is_true(
-    attachment, is_shared, expected_content
+async def test_get_content(
+    attachment, is_shared, source, patch_download, patch_access_token
 ):
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client._set_access_token = AsyncMock()
-
-        with mock.patch("aiohttp.ClientSession.post", return_value=get_stream_reader()):
-            with mock.patch(
-                "aiohttp.StreamReader.iter_chunked",
-                return_value=AsyncIterator([bytes(RESPONSE_CONTENT, "utf-8")]),
-            ):
-                response = await source.get_content(
-                    attachment=attachment,
-                    is_shared=is_shared,
-                    doit=True,
-                )
-                assert response == expected_content
-
-
-@pytest.mark.asyncio
-@freeze_time("2023-01-01T06:06:06")
-async def test_fetch_files_folders():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.path = "/"
-
-        actual_response = []
-        with patch.object(
-            source.dropbox_client,
-            "api_call",
-            side_effect=[
-                AsyncIterator([JSONAsyncMock(MOCK_FILES_FOLDERS, status=200)]),
-                AsyncIterator([JSONAsyncMock(MOCK_FILES_FOLDERS_CONTINUE, status=200)]),
-            ],
-        ):
-            async for document, _ in source._fetch_files_folders("/"):
-                actual_response.append(document)
+    response = await source.get_content(
+        attachment=attachment,
+        is_shared=is_shared,
+        doit=True,
+    )
+    assert response == EXPECTED_CONTENT
 
-        assert actual_response == EXPECTED_FILES_FOLDERS
+
+@pytest.mark.parametrize(
+    "attachment_override",
+    [
+        {"size": 0},
+        {"name": "dummy_file"},
+        {"name": "dummy_file.xyz"},
+        {"size": 23000000},
+        {"is_downloadable": False},
+    ],
+)
+async def test_get_content_then_skip(
+    attachment_override, source, patch_download, patch_access_token
+):
+    response = await source.get_content(
+        attachment=MOCK_ATTACHMENT | attachment_override,
+        doit=True,
+    )
+    assert response is None
 
 
-@pytest.mark.asyncio
 @freeze_time("2023-01-01T06:06:06")
-async def test_fetch_shared_files():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.path = "/"
-
-        actual_response = []
-        with patch.object(
-            source.dropbox_client,
-            "api_call",
-            side_effect=[
-                AsyncIterator([JSONAsyncMock(MOCK_SHARED_FILES, status=200)]),
-                AsyncIterator(
-                    [JSONAsyncMock(MOCK_RECEIVED_FILE_METADATA_1, status=200)]
-                ),
-                AsyncIterator([JSONAsyncMock(MOCK_SHARED_FILES_CONTINUE, status=200)]),
-                AsyncIterator(
-                    [JSONAsyncMock(MOCK_RECEIVED_FILE_METADATA_2, status=200)]
-                ),
-            ],
-        ):
-            async for document, _ in source._fetch_shared_files():
-                actual_response.append(document)
+async def test_fetch_files_folders(source):
+    source.dropbox_client.path = "/"
+
+    actual_response = []
+    with patch.object(
+        source.dropbox_client,
+        "api_call",
+        side_effect=[
+            async_generator(MockResponse(MOCK_FILES_FOLDERS, status=200)),
+            async_generator(MockResponse(MOCK_FILES_FOLDERS_CONTINUE, status=200)),
+        ],
+    ):
+        async for document, _ in source._fetch_files_folders("/"):
+            actual_response.append(document)
 
-        assert actual_response == EXPECTED_SHARED_FILES
+    assert tuple(actual_response) == EXPECTED_FILES_FOLDERS
 
 
-@pytest.mark.asyncio
-@freeze_time("2023-01-01T06:06:06")
-async def test_search_files():
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        rule = {
-            "query": "copy",
-            "options": {
-                "path": "/500_files",
-                "file_status": "active",
-            },
-        }
+async def test_fetch_shared_files(source):
+    source.dropbox_client.path = "/"
 
-        actual_response = []
-        with patch.object(
-            source.dropbox_client,
-            "api_call",
-            side_effect=[
-                AsyncIterator([JSONAsyncMock(MOCK_SEARCH_FILE_1, status=200)]),
-                AsyncIterator([JSONAsyncMock(MOCK_SEARCH_FILE_2, status=200)]),
-            ],
-        ):
-            async for document, _ in source.advanced_sync(rule=rule):
-                actual_response.append(document)
+    actual_response = []
+    with patch.object(
+        source.dropbox_client,
+        "api_call",
+        side_effect=[
+            async_generator(MockResponse(MOCK_SHARED_FILES, status=200)),
+            async_generator(MockResponse(MOCK_RECEIVED_FILE_METADATA_1, status=200)),
+            async_generator(MockResponse(MOCK_SHARED_FILES_CONTINUE, status=200)),
+            async_generator(MockResponse(MOCK_RECEIVED_FILE_METADATA_2, status=200)),
+        ],
+    ):
+        async for document, _ in source._fetch_shared_files():
+            actual_response.append(document)
 
-        assert actual_response == [
-            {
-                "_id": "id:bJ86SIuuyXkAAAAAAAAAEQ",
-                "type": "File",
-                "name": "500_Copy.py",
-                "file_path": "/500_files/500_Copy.py",
-                "size": 512000,
-                "_timestamp": "2023-01-01T06:06:06Z",
-            }
-        ]
+    assert tuple(actual_response) == EXPECTED_SHARED_FILES
+
+
+async def test_search_files(source):
+    rule = {
+        "query": "copy",
+        "options": {
+            "path": "/500_files",
+            "file_status": "active",
+        },
+    }
+
+    actual_response = []
+    with patch.object(
+        source.dropbox_client,
+        "api_call",
+        side_effect=[
+            async_generator(MockResponse(MOCK_SEARCH_FILE_1, status=200)),
+            async_generator(MockResponse(MOCK_SEARCH_FILE_2, status=200)),
+        ],
+    ):
+        async for document, _ in source.advanced_sync(rule=rule):
+            actual_response.append(document)
+
+    assert actual_response == [
+        {
+            "_id": "id:bJ86SIuuyXkAAAAAAAAAEQ",
+            "type": "File",
+            "name": "500_Copy.py",
+            "file_path": "/500_files/500_Copy.py",
+            "size": 512000,
+            "_timestamp": "2023-01-01T06:06:06Z",
+        }
+    ]
 
 
-@pytest.mark.asyncio
-@freeze_time("2023-01-01T06:06:06")
 @patch.object(
     DropboxDataSource,
     "_fetch_files_folders",
@@ -837,17 +726,14 @@ async def test_search_files():
         ],
     ),
 )
-async def test_get_docs(files_folders_patch, shared_files_patch):
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        expected_responses = [*EXPECTED_FILES_FOLDERS, *EXPECTED_SHARED_FILES]
-        source.get_content = Mock(return_value=EXPECTED_CONTENT)
+async def test_get_docs(files_folders_patch, shared_files_patch, source):
+    source.get_content = Mock(return_value=EXPECTED_CONTENT)
 
-        documents = []
-        async for item, _ in source.get_docs():
-            documents.append(item)
+    documents = []
+    async for item, _ in source.get_docs():
+        documents.append(item)
 
-        assert documents == expected_responses
+    assert tuple(documents) == EXPECTED_ALL
 
 
 @pytest.mark.parametrize(
@@ -871,19 +757,16 @@ async def test_get_docs(files_folders_patch, shared_files_patch):
         )
     ],
 )
-@pytest.mark.asyncio
 async def test_advanced_rules_validation_with_invalid_repos(
-    advanced_rules, expected_validation_result
+    advanced_rules, expected_validation_result, source
 ):
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.dropbox_client.check_path = AsyncMock(side_effect=InvalidPathException())
+    source.dropbox_client.check_path = AsyncMock(side_effect=InvalidPathException())
 
-        validation_result = await DropBoxAdvancedRulesValidator(source).validate(
-            advanced_rules
-        )
+    validation_result = await DropBoxAdvancedRulesValidator(source).validate(
+        advanced_rules
+    )
 
-        assert validation_result == expected_validation_result
+    assert validation_result == expected_validation_result
 
 
 @pytest.mark.parametrize(
@@ -934,36 +817,33 @@ async def test_advanced_rules_validation_with_invalid_repos(
     DropboxClient,
     "api_call",
     side_effect=AsyncIterator(
-        [JSONAsyncMock(MOCK_SEARCH_FILE_3, 200)],
+        [MockResponse(MOCK_SEARCH_FILE_3, 200)],
     ),
 )
-@pytest.mark.asyncio
 async def test_get_docs_with_advanced_rules(
-    received_files_patch, files_folders_patch, filtering
+    received_files_patch, files_folders_patch, filtering, source
 ):
-    async with create_source(DropboxDataSource) as source:
-        setup_dropbox(source)
-        source.get_content = Mock(return_value=EXPECTED_CONTENT)
+    source.get_content = Mock(return_value=EXPECTED_CONTENT)
 
-        documents = []
-        async for item, _ in source.get_docs(filtering):
-            documents.append(item)
+    documents = []
+    async for item, _ in source.get_docs(filtering):
+        documents.append(item)
 
-        assert documents == [
-            {
-                "_id": "id:bJ86SIuuyXkAAAAAAAAAEQ",
-                "type": "File",
-                "name": "500_Copy.py",
-                "file_path": "/500_files/500_Copy.py",
-                "size": 512000,
-                "_timestamp": "2023-01-01T06:06:06Z",
-            },
-            {
-                "_id": "id:bJ86SIuuyXkAAAAAAAAAEQ",
-                "type": "File",
-                "name": "dummy_file.txt",
-                "url": "https://www.dropbox.com/scl/fi/pqr123/dummy_file.txt?dl=0",
-                "size": 200,
-                "_timestamp": "2023-01-01T06:06:06Z",
-            },
-        ]
+    assert documents == [
+        {
+            "_id": "id:bJ86SIuuyXkAAAAAAAAAEQ",
+            "type": "File",
+            "name": "500_Copy.py",
+            "file_path": "/500_files/500_Copy.py",
+            "size": 512000,
+            "_timestamp": "2023-01-01T06:06:06Z",
+        },
+        {
+            "_id": "id:bJ86SIuuyXkAAAAAAAAAEQ",
+            "type": "File",
+            "name": "dummy_file.txt",
+            "url": "https://www.dropbox.com/scl/fi/pqr123/dummy_file.txt?dl=0",
+            "size": 200,
+            "_timestamp": "2023-01-01T06:06:06Z",
+        },
+    ]